@@ -6,18 +6,15 @@ Denní automatizace všech 4 kroků řešení
 
 from datetime import datetime, timedelta
 from airflow import DAG
-from airflow.operators.python import PythonOperator
+from airflow.decorators import task
 from airflow.operators.dummy import DummyOperator
 
-# Import našich modulů
+# Import našich modulů - těžké závislosti (pandas, httpx, selectolax) se importují
+# až uvnitř tasků, aby nezpomalovaly opakované parsování DAG souboru schedulerem
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from data_downloader import MKCRDataDownloader
-from data_processor import KnihovnyDataProcessor
-from ccmm_generator import CCMMGenerator
-
 # DAG konfigurace
 default_args = {
     'owner': 'data-engineering-team',
@@ -40,8 +37,10 @@ dag = DAG(
     tags=['knihovny', 'mkcr', 'etl']
 )
 
-def download_data_task(**context):
+@task(task_id='download_data', dag=dag)
+def download_data_task():
     """1. Automatické stahování dat ze zdroje"""
+    from data_downloader import MKCRDataDownloader
     
     downloader = MKCRDataDownloader()
     result = downloader.download_latest_evidence(output_dir="/tmp/knihovny_data")
@@ -49,17 +48,15 @@ def download_data_task(**context):
     if result['status'] != 'success':
         raise ValueError(f"Download failed: {result.get('error')}")
     
-    # Push pro další tasky
-    context['task_instance'].xcom_push(key='csv_file', value=result['csv_file'])
-    context['task_instance'].xcom_push(key='xlsx_file', value=result['xlsx_file'])
-    
     print(f"SUCCESS: Downloaded {result['csv_file']}")
     return result
 
-def process_data_task(**context):
+@task(task_id='process_data', dag=dag)
+def process_data_task(download_result):
     """2. Transformace a úpravy pro interoperabilitu"""
+    from data_processor import KnihovnyDataProcessor
     
-    csv_file = context['task_instance'].xcom_pull(task_ids='download_data', key='csv_file')
+    csv_file = download_result.get('csv_file')
     
     if not csv_file:
         raise ValueError("CSV file not found")
@@ -70,40 +67,43 @@ def process_data_task(**context):
     metrics = processor.calculate_quality_metrics()
     files = processor.export_formats(output_dir="/tmp/knihovny_processed")
     
-    # Push metriky pro další tasky
-    context['task_instance'].xcom_push(key='quality_metrics', value=metrics)
-    context['task_instance'].xcom_push(key='processed_files', value=files)
-    
     print(f"SUCCESS: Processed {metrics['total_records']} records")
     print(f"Quality score: {metrics['quality_score']:.2%}")
-    return metrics
+    return {'quality_metrics': metrics, 'processed_files': files}
 
-def store_data_task(**context):
+@task(task_id='store_data', dag=dag)
+def store_data_task(process_result):
     """3. Trvalé a bezpečné uložení dat"""
+    import pandas as pd
     
     # V produkci by zde bylo skutečné uložení do databáze
-    processed_files = context['task_instance'].xcom_pull(task_ids='process_data', key='processed_files')
+    processed_files = process_result['processed_files']
+    df = pd.read_parquet(processed_files['parquet'])
     
     # Simulace database insert a backup
     storage_result = {
         'database_inserted': True,
+        'records_stored': len(df),
         'backup_created': True,
         'backup_location': 's3://knihovny-backup/daily/',
         'storage_time': datetime.now().isoformat()
     }
     
-    context['task_instance'].xcom_push(key='storage_result', value=storage_result)
-    
     print(f"SUCCESS: Data stored and backed up")
     return storage_result
 
-def generate_ccmm_task(**context):
+@task(task_id='generate_ccmm', dag=dag)
+def generate_ccmm_task(process_result):
     """4. Generování CCMM metadat"""
+    from ccmm_generator import CCMMGenerator
     
-    quality_metrics = context['task_instance'].xcom_pull(task_ids='process_data', key='quality_metrics')
+    quality_metrics = process_result['quality_metrics']
     
     generator = CCMMGenerator()
-    metadata = generator.generate_dataset_metadata(quality_metrics)
+    # Distribuce jen pro formáty, které process_data skutečně vyexportoval
+    metadata = generator.generate_dataset_metadata(
+        quality_metrics, formats=list(process_result['processed_files'])
+    )
     
     # Validace CCMM
     validation = generator.validate_ccmm(metadata)
@@ -113,24 +113,19 @@ def generate_ccmm_task(**context):
     # Export metadat
     output_file = generator.export_metadata(metadata, "/tmp/knihovny_ccmm.json")
     
-    context['task_instance'].xcom_push(key='ccmm_file', value=output_file)
-    
     print(f"SUCCESS: CCMM metadata generated: {output_file}")
     return {'ccmm_file': output_file, 'validation': validation}
 
-def generate_report_task(**context):
+@task(task_id='generate_report', dag=dag)
+def generate_report_task(download_result, process_result, storage_result, ccmm_result, ds=None):
     """Generuje závěrečný report"""
     
-    # Získání výsledků ze všech tasků
-    download_result = context['task_instance'].xcom_pull(task_ids='download_data')
-    process_result = context['task_instance'].xcom_pull(task_ids='process_data')
-    storage_result = context['task_instance'].xcom_pull(task_ids='store_data')
-    ccmm_result = context['task_instance'].xcom_pull(task_ids='generate_ccmm')
+    quality_metrics = process_result['quality_metrics']
     
     report = f"""
 KNIHOVNY ETL DAILY REPORT
 ========================
-Date: {context['ds']}
+Date: {ds}
 Pipeline: {dag.dag_id}
 
 1. DATA DOWNLOAD:
@@ -138,9 +133,9 @@ Pipeline: {dag.dag_id}
    Source: MK ČR website
    
 2. DATA PROCESSING:
-   Records: {process_result['total_records']:,}
-   Quality Score: {process_result['quality_score']:.1%}
-   Email Coverage: {process_result['email_completeness']:.1%}
+   Records: {quality_metrics['total_records']:,}
+   Quality Score: {quality_metrics['quality_score']:.1%}
+   Email Coverage: {quality_metrics['email_completeness']:.1%}
    
 3. DATA STORAGE:
    Database: {'OK' if storage_result['database_inserted'] else 'FAILED'}
@@ -156,49 +151,26 @@ Pipeline completed successfully!
     print(report)
     return report
 
-# Task definitions
+# Task definitions - návratové hodnoty tasků předává Airflow přes XCom automaticky
 start_task = DummyOperator(
     task_id='start_pipeline',
     dag=dag
 )
 
-download_data = PythonOperator(
-    task_id='download_data',
-    python_callable=download_data_task,
-    dag=dag
-)
-
-process_data = PythonOperator(
-    task_id='process_data',
-    python_callable=process_data_task,
-    dag=dag
-)
-
-store_data = PythonOperator(
-    task_id='store_data',
-    python_callable=store_data_task,
-    dag=dag
-)
-
-generate_ccmm = PythonOperator(
-    task_id='generate_ccmm',
-    python_callable=generate_ccmm_task,
-    dag=dag
-)
-
-generate_report = PythonOperator(
-    task_id='generate_report',
-    python_callable=generate_report_task,
-    dag=dag
-)
+download_data = download_data_task()
+process_data = process_data_task(download_data)
+store_data = store_data_task(process_data)
+generate_ccmm = generate_ccmm_task(process_data)
+generate_report = generate_report_task(download_data, process_data, store_data, generate_ccmm)
 
 end_task = DummyOperator(
     task_id='end_pipeline',
     dag=dag
 )
 
-# Task dependencies - lineární flow řešení všech 4 otázek
-start_task >> download_data >> process_data >> store_data >> generate_ccmm >> generate_report >> end_task
+# Task dependencies - store_data a generate_ccmm závisí jen na process_data, běží paralelně
+start_task >> download_data
+generate_report >> end_task
 
 if __name__ == "__main__":
     print(f"Knihovny ETL DAG loaded: {dag.dag_id}")
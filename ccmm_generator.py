@@ -4,22 +4,30 @@ CCMM (Czech Core Metadata Model) generátor
 Řešení pro otázku 4: Popis datové sady pomocí CCMM
 """
 
-import json
+import orjson
 from datetime import datetime
 from pathlib import Path
 
 class CCMMGenerator:
     """Generátor CCMM metadat pro evidenci knihoven"""
     
+    # Povinná pole CCMM metadat
+    _REQUIRED_FIELDS = frozenset({
+        '@context', '@type', 'dct:title', 'dct:description',
+        'dct:publisher', 'dcat:contactPoint'
+    })
+    
     def __init__(self):
         self.base_uri = "https://knihovny.cz/"
         
-    def generate_dataset_metadata(self, stats=None):
+    def generate_dataset_metadata(self, stats=None, formats=None):
         """
         Generuje CCMM metadata pro dataset knihoven
         
         Args:
             stats: Statistiky zpracování dat (volitelné)
+            formats: Formáty, které pipeline skutečně vyprodukovala (např. 'csv',
+                'jsonld'); distribuce se uvedou jen pro ně. None = všechny
             
         Returns:
             CCMM metadata jako dictionary
@@ -111,7 +119,7 @@ class CCMMGenerator:
             },
             
             # Distributions
-            "dcat:distribution": self._generate_distributions()
+            "dcat:distribution": self._generate_distributions(formats)
         }
         
         # Přidání quality measurements pokud máme statistiky
@@ -120,36 +128,38 @@ class CCMMGenerator:
         
         return ccmm_metadata
     
-    def _generate_distributions(self):
-        """Generuje dostupné distribuce dat"""
+    def _generate_distributions(self, formats=None):
+        """Generuje dostupné distribuce dat (volitelně jen pro zadané formáty)"""
         
         distributions = []
         
         # CSV distribuce
-        distributions.append({
-            "@type": "dcat:Distribution",
-            "@id": f"{self.base_uri}distribution/knihovny-csv",
-            "dct:title": {
-                "@language": "cs",
-                "@value": "Evidence knihoven - CSV"
-            },
-            "dct:format": "http://publications.europa.eu/resource/authority/file-type/CSV",
-            "dcat:mediaType": "text/csv",
-            "dcat:downloadURL": f"{self.base_uri}api/export/csv"
-        })
+        if formats is None or 'csv' in formats:
+            distributions.append({
+                "@type": "dcat:Distribution",
+                "@id": f"{self.base_uri}distribution/knihovny-csv",
+                "dct:title": {
+                    "@language": "cs",
+                    "@value": "Evidence knihoven - CSV"
+                },
+                "dct:format": "http://publications.europa.eu/resource/authority/file-type/CSV",
+                "dcat:mediaType": "text/csv",
+                "dcat:downloadURL": f"{self.base_uri}api/export/csv"
+            })
         
         # JSON-LD distribuce
-        distributions.append({
-            "@type": "dcat:Distribution",
-            "@id": f"{self.base_uri}distribution/knihovny-jsonld", 
-            "dct:title": {
-                "@language": "cs",
-                "@value": "Evidence knihoven - JSON-LD"
-            },
-            "dct:format": "http://publications.europa.eu/resource/authority/file-type/JSON_LD",
-            "dcat:mediaType": "application/ld+json",
-            "dcat:downloadURL": f"{self.base_uri}api/export/jsonld"
-        })
+        if formats is None or 'jsonld' in formats:
+            distributions.append({
+                "@type": "dcat:Distribution",
+                "@id": f"{self.base_uri}distribution/knihovny-jsonld", 
+                "dct:title": {
+                    "@language": "cs",
+                    "@value": "Evidence knihoven - JSON-LD"
+                },
+                "dct:format": "http://publications.europa.eu/resource/authority/file-type/JSON_LD",
+                "dcat:mediaType": "application/ld+json",
+                "dcat:downloadURL": f"{self.base_uri}api/export/jsonld"
+            })
         
         return distributions
     
@@ -191,23 +201,15 @@ class CCMMGenerator:
     def validate_ccmm(self, metadata):
         """Základní validace CCMM souladu"""
         
-        required_fields = [
-            '@context', '@type', 'dct:title', 'dct:description',
-            'dct:publisher', 'dcat:contactPoint'
-        ]
+        # Kontrola povinných polí
+        missing_fields = sorted(self._REQUIRED_FIELDS - metadata.keys())
         
         validation = {
-            'is_valid': True,
-            'missing_fields': [],
+            'is_valid': not missing_fields,
+            'missing_fields': missing_fields,
             'warnings': []
         }
         
-        # Kontrola povinných polí
-        for field in required_fields:
-            if field not in metadata:
-                validation['missing_fields'].append(field)
-                validation['is_valid'] = False
-        
         # Kontrola distribucí
         if 'dcat:distribution' not in metadata:
             validation['warnings'].append('No distributions defined')
@@ -220,8 +222,11 @@ class CCMMGenerator:
         output_file = Path(output_path)
         output_file.parent.mkdir(exist_ok=True)
         
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(metadata, f, ensure_ascii=False, indent=2)
+        with open(output_file, 'wb') as f:
+            f.write(orjson.dumps(
+                metadata,
+                option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY
+            ))
         
         print(f"CCMM metadata exported to {output_file}")
         return str(output_file)
@@ -4,9 +4,11 @@ Automatické stahování XLSX dat z MK ČR
 Řešení pro otázku 1: Automatické stahování dat ze zdroje
 """
 
-import requests
-import pandas as pd
-from bs4 import BeautifulSoup
+import asyncio
+import csv
+import httpx
+from python_calamine import CalamineWorkbook
+from selectolax.lexbor import LexborHTMLParser
 import re
 from datetime import date, datetime
 import logging
@@ -20,29 +22,29 @@ class MKCRDataDownloader:
     def __init__(self):
         self.base_url = "https://mk.gov.cz"
         self.evidence_page = "/evidence-knihoven-adresar-knihoven-evidovanych-ministerstvem-kultury-a-souvisejici-informace-cs-341"
-        self.session = requests.Session()
-        self.session.headers.update({
+        self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        })
+        }
+        self.client = httpx.Client(headers=self.headers, follow_redirects=True, timeout=60.0)
     
     def find_xlsx_links(self):
         """Najde XLSX odkazy na stránce MK ČR"""
         try:
             url = f"{self.base_url}{self.evidence_page}"
-            response = self.session.get(url)
+            response = self.client.get(url)
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.content, 'html.parser')
+            tree = LexborHTMLParser(response.content)
             
             # Hledání XLSX odkazů
             xlsx_links = []
-            for link in soup.find_all('a', href=True):
-                href = link['href']
+            for link in tree.css('a[href]'):
+                href = link.attributes.get('href') or ''
                 if '.xlsx' in href.lower() and 'evidence' in href.lower():
                     full_url = href if href.startswith('http') else f"{self.base_url}{href}"
                     xlsx_links.append({
                         'url': full_url,
-                        'text': link.get_text(strip=True),
+                        'text': link.text(strip=True),
                         'found_at': datetime.now()
                     })
             
@@ -53,18 +55,38 @@ class MKCRDataDownloader:
             logger.error(f"Error finding XLSX links: {e}")
             return []
     
+    def probe_links(self, xlsx_links):
+        """Paralelně ověří dostupnost nalezených XLSX odkazů"""
+        return asyncio.run(self._probe_links(xlsx_links))
+    
+    async def _probe_links(self, xlsx_links):
+        """Odešle HEAD požadavky na všechny odkazy současně"""
+        async with httpx.AsyncClient(
+            headers=self.headers, follow_redirects=True, http2=True, timeout=30.0
+        ) as client:
+            responses = await asyncio.gather(
+                *(client.head(link['url']) for link in xlsx_links),
+                return_exceptions=True
+            )
+        
+        available = [
+            link for link, response in zip(xlsx_links, responses)
+            if not isinstance(response, Exception) and response.is_success
+        ]
+        logger.info(f"{len(available)} of {len(xlsx_links)} XLSX links available")
+        return available
+    
     def download_file(self, url, output_path):
         """Stáhne soubor z URL"""
         try:
-            response = self.session.get(url, stream=True)
-            response.raise_for_status()
-            
             output_file = Path(output_path)
             output_file.parent.mkdir(parents=True, exist_ok=True)
             
-            with open(output_file, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
+            with self.client.stream('GET', url) as response:
+                response.raise_for_status()
+                with open(output_file, 'wb') as f:
+                    for chunk in response.iter_bytes(chunk_size=65536):
+                        f.write(chunk)
             
             logger.info(f"File downloaded: {output_file}")
             return str(output_file)
@@ -74,10 +96,17 @@ class MKCRDataDownloader:
             raise
     
     def convert_xlsx_to_csv(self, xlsx_path, csv_path):
-        """Konvertuje XLSX na CSV"""
+        """Konvertuje XLSX na CSV (po řádcích, bez mezikroku přes DataFrame)"""
         try:
-            df = pd.read_excel(xlsx_path)
-            df.to_csv(csv_path, index=False, encoding='utf-8')
+            sheet = CalamineWorkbook.from_path(str(xlsx_path)).get_sheet_by_index(0)
+            
+            with open(csv_path, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f, lineterminator='\n')
+                writer.writerows(
+                    [self._format_cell(value) for value in row]
+                    for row in sheet.iter_rows()
+                )
+            
             logger.info(f"Converted to CSV: {csv_path}")
             return csv_path
             
@@ -85,6 +114,18 @@ class MKCRDataDownloader:
             logger.error(f"Error converting XLSX to CSV: {e}")
             raise
     
+    @staticmethod
+    def _format_cell(value):
+        """
+        Upraví hodnotu buňky pro CSV stejně jako dřívější převod přes pandas
+        (celá čísla bez desetinné části, datumy jako 'YYYY-MM-DD HH:MM:SS')
+        """
+        if isinstance(value, float) and value.is_integer():
+            return int(value)
+        if isinstance(value, date) and not isinstance(value, datetime):
+            return datetime.combine(value, datetime.min.time())
+        return value
+    
     def download_latest_evidence(self, output_dir="data"):
         """
         Stáhne nejnovější evidenci knihoven
@@ -98,7 +139,9 @@ class MKCRDataDownloader:
             if not xlsx_links:
                 raise ValueError("No XLSX links found")
             
-            # Vybereme první nalezený
+            # Při více kandidátech ověříme dostupnost paralelně, jinak bereme první nalezený
+            if len(xlsx_links) > 1:
+                xlsx_links = self.probe_links(xlsx_links) or xlsx_links
             selected_link = xlsx_links[0]
             
             # Názvy výstupních souborů
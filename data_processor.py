@@ -5,12 +5,41 @@ Zpracování a transformace dat knihoven
 """
 
 import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import csv
 import re
-import json
+import orjson
 import hashlib
 from datetime import datetime
 from pathlib import Path
 
+# Vzory pro vektorizované čištění sloupců
+_PSC_PATTERN = r'[^0-9]'  # PSČ se čistí Arrow compute kernelem
+_EMAIL_RE = re.compile(r'^[^\s@]+@[^\s@]+\.[^\s@]+$')
+_URL_SCHEMES = ('http://', 'https://')
+
+# Podporované exportní formáty
+EXPORT_FORMATS = ('csv', 'json', 'jsonld', 'parquet')
+DEFAULT_EXPORT_FORMATS = ('parquet', 'jsonld')
+
+# Mapování sloupců na vlastnosti schema.org pro JSON-LD export
+_JSONLD_LIBRARY_FIELDS = {
+    'library_uri': '@id',
+    'I - NÁZEV KNIHOVNY': 'name',
+    'R - EVIDENČNÍ ČÍSLO KNIHOVNY': 'identifier',
+    'N - e-mailový kontakt na knihovnu': 'email',
+    'O - odkaz na webovou stránku knihovny, respektive odkaz na informace o knihovně na webových stránkách provozovatele_normalized': 'url',
+}
+_JSONLD_ADDRESS_FIELDS = {
+    'K - adresa knihovny: ulice': 'streetAddress',
+    'K - adresa knihovny: PSČ': 'postalCode',
+    'K - adresa knihovny: město': 'addressLocality',
+    'K - adresa knihovny: kraj': 'addressRegion',
+}
+
 class KnihovnyDataProcessor:
     """Procesor pro transformaci dat knihoven"""
     
@@ -21,13 +50,22 @@ class KnihovnyDataProcessor:
     def load_data(self):
         """Načte CSV data s původními českými názvy sloupců"""
         try:
-            self.df = pd.read_csv(
+            # Všechny sloupce jako text - z hlavičky zjistíme jejich názvy
+            with open(self.csv_file_path, newline='', encoding='utf-8') as f:
+                columns = next(csv.reader(f))
+            
+            table = pacsv.read_csv(
                 self.csv_file_path,
-                encoding='utf-8',
-                dtype=str,
-                na_values=['', 'NULL', 'null', 'N/A'],
-                keep_default_na=False
+                # Buňky z XLSX mohou obsahovat zalomení řádku (Alt+Enter)
+                parse_options=pacsv.ParseOptions(newlines_in_values=True),
+                convert_options=pacsv.ConvertOptions(
+                    column_types={col: pa.string() for col in columns},
+                    null_values=['', 'NULL', 'null', 'N/A'],
+                    strings_can_be_null=True
+                )
             )
+            # Chybějící hodnoty zůstávají jako None, transformace je zpracují stejně jako NaN
+            self.df = table.to_pandas()
             print(f"Loaded {len(self.df)} records with {len(self.df.columns)} columns")
             return self.df
             
@@ -43,32 +81,33 @@ class KnihovnyDataProcessor:
         if self.df is None:
             self.load_data()
         
-        # Kopie pro transformace
-        df_transformed = self.df.copy()
+        # Mělká kopie pro transformace - transformace jen přidávají nové sloupce,
+        # původní data v self.df se nemění a není třeba je kopírovat
+        df_transformed = self.df.copy(deep=False)
         
         # 1. PSČ normalizace
         psc_columns = [col for col in df_transformed.columns if 'PSČ' in col]
         for col in psc_columns:
-            df_transformed[f'{col}_clean'] = df_transformed[col].str.replace(r'[^\d]', '', regex=True)
+            psc = pa.array(df_transformed[col], type=pa.string(), from_pandas=True)
+            df_transformed[f'{col}_clean'] = pc.replace_substring_regex(
+                psc, pattern=_PSC_PATTERN, replacement=''
+            ).to_numpy(zero_copy_only=False)
         
         # 2. Email validace
         email_columns = [col for col in df_transformed.columns if 'e-mail' in col.lower()]
         for col in email_columns:
-            df_transformed[f'{col}_valid'] = df_transformed[col].str.match(
-                r'^[^\s@]+@[^\s@]+\.[^\s@]+$', na=False
-            )
+            df_transformed[f'{col}_valid'] = df_transformed[col].str.contains(_EMAIL_RE, na=False)
         
         # 3. URL normalizace
         url_columns = [col for col in df_transformed.columns if 'webov' in col.lower()]
         for col in url_columns:
-            df_transformed[f'{col}_normalized'] = df_transformed[col].apply(
-                lambda x: self._normalize_url(x)
-            )
+            df_transformed[f'{col}_normalized'] = self._normalize_urls(df_transformed[col])
         
         # 4. Status normalizace
         if 'aktivní / zrušená (vyřazená z evidence)' in df_transformed.columns:
-            df_transformed['is_active'] = df_transformed['aktivní / zrušená (vyřazená z evidence)'].apply(
-                lambda x: str(x).lower().strip() == 'aktivní' if pd.notna(x) else False
+            df_transformed['is_active'] = (
+                df_transformed['aktivní / zrušená (vyřazená z evidence)']
+                .str.lower().str.strip().eq('aktivní')
             )
         
         # 5. Linking keys pro interoperabilitu
@@ -77,18 +116,19 @@ class KnihovnyDataProcessor:
         self.df_transformed = df_transformed
         return df_transformed
     
-    def _normalize_url(self, url):
-        """Normalizuje URL adresy"""
-        if pd.isna(url) or url == '':
-            return None
-        
-        url = str(url).strip()
-        if not url.startswith(('http://', 'https://')):
-            if url.startswith('www.'):
-                url = 'https://' + url
-            else:
-                url = 'https://www.' + url
-        return url
+    def _normalize_urls(self, urls):
+        """Normalizuje URL adresy (vektorizovaně nad celým sloupcem)"""
+        s = urls.fillna('').str.strip()
+        
+        # Nejprve se určí chybějící prefix, řetězce se pak spojí jediným průchodem
+        prefix = np.select(
+            [s.str.startswith(_URL_SCHEMES).to_numpy(), s.str.startswith('www.').to_numpy()],
+            ['', 'https://'],
+            default='https://www.'
+        )
+        normalized = (pd.Series(prefix, index=s.index) + s).to_numpy(dtype=object, copy=True)
+        normalized[(s == '').to_numpy()] = None
+        return normalized
     
     def _add_linking_keys(self, df):
         """Přidá propojovací klíče pro interoperabilitu"""
@@ -96,22 +136,24 @@ class KnihovnyDataProcessor:
         # Knihovna hash (pro jedinečnou identifikaci)
         if 'R - EVIDENČNÍ ČÍSLO KNIHOVNY' in df.columns:
             df['knihovna_id'] = df['R - EVIDENČNÍ ČÍSLO KNIHOVNY'].str.replace(' ', '-', regex=False)
-            df['knihovna_hash'] = df['R - EVIDENČNÍ ČÍSLO KNIHOVNY'].apply(
-                lambda x: hashlib.md5(str(x).encode()).hexdigest() if pd.notna(x) else None
-            )
+            # MD5 hash zůstává kvůli kompatibilitě uložených hodnot, počítá se jen pro vyplněná čísla
+            evidencni_cisla = df['R - EVIDENČNÍ ČÍSLO KNIHOVNY'].dropna()
+            df['knihovna_hash'] = pd.Series(
+                [hashlib.md5(x.encode()).hexdigest() for x in evidencni_cisla],
+                index=evidencni_cisla.index,
+                dtype=object
+            ).reindex(df.index)
         
-        # Geografický klíč
+        # Geografický klíč (prázdný, pokud chybí kraj nebo okres)
         if all(col in df.columns for col in ['K - adresa knihovny: kraj', 'K - adresa knihovny: okres']):
             df['geo_key'] = (
-                df['K - adresa knihovny: kraj'].astype(str) + '_' + 
-                df['K - adresa knihovny: okres'].astype(str)
+                df['K - adresa knihovny: kraj'] + '_' + 
+                df['K - adresa knihovny: okres']
             )
         
         # URI pro linked data
         if 'R - EVIDENČNÍ ČÍSLO KNIHOVNY' in df.columns:
-            df['library_uri'] = df['R - EVIDENČNÍ ČÍSLO KNIHOVNY'].apply(
-                lambda x: f"https://knihovny.cz/library/{str(x).replace(' ', '-')}" if pd.notna(x) else None
-            )
+            df['library_uri'] = 'https://knihovny.cz/library/' + df['knihovna_id']
     
     def calculate_quality_metrics(self):
         """Vypočítá metriky kvality dat"""
@@ -121,16 +163,18 @@ class KnihovnyDataProcessor:
         df = self.df_transformed
         total_records = len(df)
         
-        # Email completeness
         email_col = next((col for col in df.columns if 'e-mail' in col.lower() and 'knihovn' in col.lower()), None)
-        email_completeness = df[email_col].notna().sum() / total_records if email_col else 0
-        
-        # Web completeness  
         web_col = next((col for col in df.columns if 'webov' in col.lower()), None)
-        web_completeness = df[web_col].notna().sum() / total_records if web_col else 0
         
-        # Active libraries
-        active_ratio = df['is_active'].sum() / total_records if 'is_active' in df.columns else 0
+        # Email/web completeness a podíl aktivních knihoven v jednom průchodu
+        mask = df[[col for col in (email_col, web_col) if col]].notna()
+        if 'is_active' in df.columns:
+            mask['is_active'] = df['is_active']
+        ratios = mask.mean()
+        
+        email_completeness = float(ratios[email_col]) if email_col else 0
+        web_completeness = float(ratios[web_col]) if web_col else 0
+        active_ratio = float(ratios['is_active']) if 'is_active' in ratios else 0
         
         return {
             'total_records': total_records,
@@ -141,8 +185,22 @@ class KnihovnyDataProcessor:
             'calculated_at': datetime.now().isoformat()
         }
     
-    def export_formats(self, output_dir="processed_data"):
-        """Exportuje data do různých formátů pro interoperabilitu"""
+    def export_formats(self, output_dir="processed_data", formats=DEFAULT_EXPORT_FORMATS):
+        """
+        Exportuje data do různých formátů pro interoperabilitu
+        
+        Args:
+            output_dir: Výstupní adresář
+            formats: Požadované formáty (csv, json, jsonld, parquet); výchozí
+                jsou Parquet pro předávání mezi tasky a JSON-LD pro linked data
+            
+        Returns:
+            Dict s cestami k exportovaným souborům podle formátu
+        """
+        unknown_formats = set(formats) - set(EXPORT_FORMATS)
+        if unknown_formats:
+            raise ValueError(f"Unsupported export formats: {sorted(unknown_formats)}")
+        
         if not hasattr(self, 'df_transformed'):
             self.transform_data()
         
@@ -154,21 +212,34 @@ class KnihovnyDataProcessor:
         exported_files = {}
         
         # 1. CSV (původní struktura s transformacemi)
-        csv_file = output_path / f"knihovny_processed_{timestamp}.csv"
-        self.df_transformed.to_csv(csv_file, index=False, encoding='utf-8')
-        exported_files['csv'] = str(csv_file)
+        if 'csv' in formats:
+            csv_file = output_path / f"knihovny_processed_{timestamp}.csv"
+            self.df_transformed.to_csv(csv_file, index=False, encoding='utf-8')
+            exported_files['csv'] = str(csv_file)
         
         # 2. JSON pro API
-        json_file = output_path / f"knihovny_api_{timestamp}.json"
-        json_data = self.df_transformed.to_dict('records')
-        with open(json_file, 'w', encoding='utf-8') as f:
-            json.dump(json_data, f, ensure_ascii=False, indent=2, default=str)
-        exported_files['json'] = str(json_file)
+        if 'json' in formats:
+            json_file = output_path / f"knihovny_api_{timestamp}.json"
+            json_data = self.df_transformed.to_dict('records')
+            with open(json_file, 'wb') as f:
+                f.write(orjson.dumps(
+                    json_data,
+                    option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY,
+                    default=str
+                ))
+            exported_files['json'] = str(json_file)
         
         # 3. JSON-LD pro linked data
-        jsonld_file = output_path / f"knihovny_linked_{timestamp}.jsonld"
-        self._export_jsonld(jsonld_file)
-        exported_files['jsonld'] = str(jsonld_file)
+        if 'jsonld' in formats:
+            jsonld_file = output_path / f"knihovny_linked_{timestamp}.jsonld"
+            self._export_jsonld(jsonld_file)
+            exported_files['jsonld'] = str(jsonld_file)
+        
+        # 4. Parquet pro předávání dat mezi tasky (typované, komprimované)
+        if 'parquet' in formats:
+            parquet_file = output_path / f"knihovny_processed_{timestamp}.parquet"
+            self.df_transformed.to_parquet(parquet_file, engine='pyarrow', compression='zstd', index=False)
+            exported_files['parquet'] = str(parquet_file)
         
         print(f"Data exported to {len(exported_files)} formats")
         return exported_files
@@ -178,37 +249,44 @@ class KnihovnyDataProcessor:
         if not hasattr(self, 'df_transformed'):
             return
         
-        libraries = []
-        for _, row in self.df_transformed.iterrows():
-            library = {
-                "@context": "https://schema.org/",
-                "@type": "Library",
-                "@id": row.get('library_uri'),
-                "name": row.get('I - NÁZEV KNIHOVNY'),
-                "identifier": row.get('R - EVIDENČNÍ ČÍSLO KNIHOVNY'),
-                "address": {
-                    "@type": "PostalAddress",
-                    "streetAddress": row.get('K - adresa knihovny: ulice'),
-                    "postalCode": row.get('K - adresa knihovny: PSČ'),
-                    "addressLocality": row.get('K - adresa knihovny: město'),
-                    "addressRegion": row.get('K - adresa knihovny: kraj'),
-                    "addressCountry": "CZ"
-                },
-                "email": row.get('N - e-mailový kontakt na knihovnu'),
-                "url": row.get('O - odkaz na webovou stránku knihovny, respektive odkaz na informace o knihovně na webových stránkách provozovatele_normalized')
-            }
-            
-            # Odstranění None hodnot
-            library = {k: v for k, v in library.items() if v is not None and v != ''}
-            libraries.append(library)
+        rename = {**_JSONLD_LIBRARY_FIELDS, **_JSONLD_ADDRESS_FIELDS}
+        sub = self.df_transformed.reindex(columns=list(rename)).rename(columns=rename)
+        sub = sub.astype(object).where(sub.notna(), None)
+        records = sub.to_dict(orient='records')
+        
+        address_keys = list(_JSONLD_ADDRESS_FIELDS.values())
+        libraries = [self._library_jsonld(r, address_keys) for r in records]
         
         jsonld_data = {
             "@context": "https://schema.org/",
             "@graph": libraries
         }
         
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(jsonld_data, f, ensure_ascii=False, indent=2)
+        with open(output_file, 'wb') as f:
+            f.write(orjson.dumps(jsonld_data, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY))
+    
+    @staticmethod
+    def _library_jsonld(record, address_keys):
+        """Sestaví JSON-LD záznam knihovny, prázdné hodnoty rovnou vynechá"""
+        address = {
+            k: v for k, v in (
+                ("@type", "PostalAddress"),
+                *((key, record[key]) for key in address_keys),
+                ("addressCountry", "CZ")
+            ) if v is not None and v != ''
+        }
+        return {
+            k: v for k, v in (
+                ("@context", "https://schema.org/"),
+                ("@type", "Library"),
+                ("@id", record['@id']),
+                ("name", record['name']),
+                ("identifier", record['identifier']),
+                ("address", address),
+                ("email", record['email']),
+                ("url", record['url'])
+            ) if v is not None and v != ''
+        }
 
 def main():
     """Test funkce"""
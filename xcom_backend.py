@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Souborový XCom backend pro knihovny ETL pipeline
+Velké XCom hodnoty (nad KNIHOVNY_XCOM_THRESHOLD bajtů po serializaci) ukládá
+do sdíleného úložiště, v metadatové databázi Airflow zůstává jen odkaz
+na soubor. Malé hodnoty zůstávají přímo v databázi.
+
+Hodnoty v souborech i v databázi používají stejnou serializaci BaseXCom,
+takže se vrací se stejnými typy bez ohledu na velikost.
+
+Aktivace:
+    AIRFLOW__CORE__XCOM_BACKEND=xcom_backend.KnihovnyFileXComBackend
+"""
+
+import os
+import re
+from pathlib import Path
+from types import SimpleNamespace
+
+from airflow.models.xcom import BaseXCom
+
+XCOM_DIR = Path(os.environ.get('KNIHOVNY_XCOM_DIR', '/tmp/knihovny_data/xcom'))
+XCOM_THRESHOLD = int(os.environ.get('KNIHOVNY_XCOM_THRESHOLD', 64 * 1024))
+XCOM_PREFIX = 'xcom-file://'
+
+_UNSAFE_CHARS_RE = re.compile(r'[^\w.-]')
+
+class KnihovnyFileXComBackend(BaseXCom):
+    """XCom backend ukládající velké hodnoty do souborů"""
+
+    @staticmethod
+    def serialize_value(value, *, key=None, task_id=None, dag_id=None, run_id=None, map_index=None, **kwargs):
+        """Uloží velkou hodnotu do souboru a do databáze předá jen jeho cestu"""
+        data = BaseXCom.serialize_value(
+            value, key=key, task_id=task_id, dag_id=dag_id, run_id=run_id, map_index=map_index
+        )
+
+        if len(data) <= XCOM_THRESHOLD:
+            return data
+
+        parts = [dag_id, run_id, task_id, key]
+        if map_index is not None and map_index >= 0:
+            parts.append(str(map_index))
+        file_name = _UNSAFE_CHARS_RE.sub('_', '__'.join(str(p) for p in parts))
+
+        XCOM_DIR.mkdir(parents=True, exist_ok=True)
+        xcom_file = XCOM_DIR / f"xcom_{file_name}.xcom"
+        with open(xcom_file, 'wb') as f:
+            f.write(data)
+
+        return BaseXCom.serialize_value(
+            f"{XCOM_PREFIX}{xcom_file}",
+            key=key, task_id=task_id, dag_id=dag_id, run_id=run_id, map_index=map_index
+        )
+
+    @staticmethod
+    def deserialize_value(result):
+        """Načte hodnotu ze souboru, pokud XCom obsahuje odkaz"""
+        value = BaseXCom.deserialize_value(result)
+
+        if isinstance(value, str) and value.startswith(XCOM_PREFIX):
+            with open(value[len(XCOM_PREFIX):], 'rb') as f:
+                return BaseXCom.deserialize_value(SimpleNamespace(value=f.read()))
+
+        return value
+
+    @staticmethod
+    def purge(xcom, session):
+        """Při mazání XComu odstraní i soubor, na který odkazuje"""
+        value = BaseXCom.deserialize_value(xcom)
+
+        if isinstance(value, str) and value.startswith(XCOM_PREFIX):
+            Path(value[len(XCOM_PREFIX):]).unlink(missing_ok=True)